@@ -7,120 +7,184 @@ Created by Jakub Konka on 2012-10-23.
 Copyright (c) 2012 University of Strathclyde. All rights reserved.
 """
 import argparse
-import csv
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import os
 import os.path
 import scipy.stats as stats
 import sys
+import warnings
 
 
-### Parse command line arguments
-parser = argparse.ArgumentParser(description="DM simulation -- Statistical analysis script")
-parser.add_argument('input_dir', help='directory with simulation results')
-parser.add_argument('context', help='data context; e.g., price, or reputation')
-parser.add_argument('mode', help='transient or steady-state')
-parser.add_argument('--confidence', dest='confidence', default=0.99,
-                    type=float, help='confidence value (default: 0.99)')
-args = parser.parse_args()
-input_dir = args.input_dir
-context = args.context
-mode = args.mode.lower()
-confidence = args.confidence
-
-### Common params
-# Ask for warm-up period index (if mode is steady-state)
-if mode == 'steady-state':
-  warmup = int(input('Warm-up period index: '))
-elif mode == 'transient':
-  warmup = 0
-  window_size = int(input('Window size: '))
-else:
-  sys.exit('Unknown mode specified.')
-# File names and paths
-extension = ".out"
-file_names = set([
-  f[:f.find(extension)] for root, _, files in os.walk(input_dir) for f in files 
-  if (f.endswith(extension)
-    and context in f
-    and 'transient' not in root 
-    and 'steady-state' not in root)
-  ])
-file_paths = [
-    os.path.join(root, f) for root, _, files in os.walk(input_dir) for f in files 
-    if (f.endswith(extension) 
-      and context in f 
-      and 'transient' not in root 
-      and 'steady-state' not in root)
-    ]
 # Reference column
-ref_column = 'sr_number'
+REF_COLUMN = 'sr_number'
+# File extension of simulation results
+EXTENSION = '.out'
+# File extension of binary simulation results (one archive per run)
+NPZ_EXTENSION = '.npz'
+
+
+def read_results(source):
+  """
+  Returns header and data array of one replication of a result file.
+
+  Arguments:
+  source -- Path to a CSV result file, or (archive path, array name)
+            tuple for binary results
+  """
+  if isinstance(source, tuple):
+    file_path, key = source
+    with np.load(file_path) as archive:
+      values = archive[key].astype(np.float64)
+    # Service request numbers are implied by array position
+    data = np.column_stack((np.arange(1, values.size + 1), values))
+    return [REF_COLUMN, key.split('_')[0]], data
+  with open(source, 'rt') as f:
+    header = f.readline().strip().split(',')
+    # Header-only files are valid (no service requests recorded)
+    with warnings.catch_warnings():
+      warnings.filterwarnings('ignore', message='loadtxt: input contained no data')
+      data = np.loadtxt(f, delimiter=',', dtype=np.float64, ndmin=2)
+  return header, data.reshape(-1, len(header))
 
-### Merge results from files
-for name in file_names:
+
+def process_name(name, paths, input_dir, mode, warmup, window_size, confidence):
+  """
+  Merges replications of one result file and saves the statistics
+  to a file in a mode-specific subdirectory of input_dir.
+
+  Arguments:
+  name -- Result file name (without extension)
+  paths -- Sources of replications of the result file (see read_results)
+  input_dir -- Directory with simulation results
+  mode -- transient or steady-state
+  warmup -- Warm-up period index
+  window_size -- Moving average window size (transient mode only)
+  confidence -- Confidence value
+  """
   # Read data from files
   data_in = []
-  for fp in file_paths:
-    if name in fp:
-      with open(fp, 'rt') as f:
-        reader = csv.DictReader(f)
-        dct = {}
-        for row in reader:
-          # Exclude data with index lower than specified warm-up period
-          if int(row[ref_column]) > warmup:
-            for key in row:
-              val = float(row[key]) if key != ref_column else int(row[key])
-              dct.setdefault(key, []).append(val)
-        data_in.append(dct)
+  for source in paths:
+    header, data = read_results(source)
+    # Exclude data with index lower than specified warm-up period
+    ref_index = header.index(REF_COLUMN)
+    filtered = data[data[:, ref_index] > warmup]
+    # Skip replications with no data left
+    if len(filtered):
+      data_in.append(filtered)
+  if not data_in:
+    print("No data after warm-up period for: {}".format(name), file=sys.stderr)
+    return
+  value_indices = [i for i, key in enumerate(header) if key != REF_COLUMN]
   # Map and reduce...
   if mode == 'steady-state':
     # Compute steady-state mean average
-    averages = [sum(dct[key]) / len(dct[key]) for dct in data_in for key in dct.keys() if key != ref_column]
-    mean = sum(averages) / len(averages)
+    averages = np.array([data[:, i].mean() for data in data_in for i in value_indices])
+    mean = averages.mean()
     # Compute standard deviation
-    sd = np.sqrt(sum(map(lambda x: (x-mean)**2, averages)) / (len(averages)-1))
+    sd = averages.std(ddof=1)
     # Compute standard error for the mean
-    se = sd / np.sqrt(len(averages))
+    se = sd / np.sqrt(averages.size)
     # Compute confidence intervals for the mean
-    ci = se * stats.t.ppf(0.5 + confidence/2, len(averages)-1)
+    ci = se * stats.t.ppf(0.5 + confidence/2, averages.size-1)
     # Save to a file
-    # Create save dir if doesn't exist already
+    # Create save dir if doesn't exist already (workers may race here)
     save_dir = input_dir + '/' + mode
-    if not os.path.exists(save_dir):
-      os.makedirs(save_dir)
-    with open(save_dir + '/' + name + extension, 'w', newline='', encoding='utf-8') as f:
-      writer = csv.writer(f, delimiter=',')
-      writer.writerow(['mean', 'sd', 'se', 'ci'])
-      writer.writerow([mean, sd, se, ci])
+    os.makedirs(save_dir, exist_ok=True)
+    np.savetxt(save_dir + '/' + name + EXTENSION, [[mean, sd, se, ci]],
+               fmt='%.17g', delimiter=',', header='mean,sd,se,ci', comments='', encoding='utf-8')
   else:
+    # Stack replications into a (replications x rows) array; rows beyond
+    # the shortest replication are dropped
+    num_rows = min(len(data) for data in data_in)
+    stacked = np.stack([data[:num_rows, i] for data in data_in for i in value_indices])
     # Compute mean
-    zipped = zip(*[dct[key] for dct in data_in for key in dct.keys() if key != ref_column])
-    init_means = list(map(lambda x: sum(x)/len(data_in), zipped))
-    means = []
+    init_means = stacked.mean(axis=0)
     if window_size == 0:
       means = init_means
     else:
-      for i in range(len(init_means) - window_size):
-        if i < window_size:
-          means += [sum([init_means[i+s] for s in range(-i, i+1)]) / (2*(i+1) - 1)]
-        else:
-          means += [sum([init_means[i+s] for s in range(-window_size, window_size+1)]) / (2*window_size + 1)]
+      # Moving average over 2*window_size+1 points computed from prefix sums;
+      # the first window_size points use a symmetric window that grows
+      # from a single point
+      num_means = max(len(init_means) - window_size, 0)
+      cum = np.concatenate(([0.0], init_means.cumsum()))
+      edge = np.arange(min(window_size, num_means))
+      edge_means = cum[2*edge + 1] / (2*edge + 1)
+      inner_means = (cum[2*window_size + 1:] - cum[:-2*window_size - 1]) / (2*window_size + 1)
+      means = np.concatenate((edge_means, inner_means))
     # Compute standard deviation
-    zipped = zip(*[dct[key] for dct in data_in for key in dct.keys() if key != ref_column])
-    sds = [np.sqrt(sum(map(lambda x: (x-mean)**2, tup)) / (len(means) - 1)) for (tup, mean) in zip(zipped, means)]
+    sds = np.sqrt(((stacked[:, :len(means)] - means)**2).sum(axis=0) / (len(means) - 1))
     # Compute standard error for the mean
-    ses = list(map(lambda x: x/np.sqrt(len(means)), sds))
+    ses = sds / np.sqrt(len(means))
     # Compute confidence intervals for the mean
-    cis = list(map(lambda x: x * stats.t.ppf(0.5 + confidence/2, len(means)-1), ses))
+    t_quantile = stats.t.ppf(0.5 + confidence/2, len(means)-1)
+    cis = ses * t_quantile
     # Save to a file
     # Create save dir if doesn't exist already
     save_dir = input_dir + '/' + mode + '_{}'.format(window_size)
-    if not os.path.exists(save_dir):
-      os.makedirs(save_dir)
-    with open(save_dir + '/' + name + extension, 'w', newline='', encoding='utf-8') as f:
-      writer = csv.writer(f, delimiter=',')
-      zip_input = [data_in[0][ref_column], means, sds, ses, cis]
-      out_headers = [ref_column, 'mean', 'sd', 'se', 'ci']
-      writer.writerow(out_headers)
-      for tup in zip(*zip_input):
-        writer.writerow(tup)
+    os.makedirs(save_dir, exist_ok=True)
+    out_data = np.column_stack((data_in[0][:len(means), ref_index], means, sds, ses, cis))
+    out_headers = [REF_COLUMN, 'mean', 'sd', 'se', 'ci']
+    np.savetxt(save_dir + '/' + name + EXTENSION, out_data,
+               fmt=['%d'] + ['%.17g'] * 4, delimiter=',', header=','.join(out_headers),
+               comments='', encoding='utf-8')
+
+
+if __name__ == '__main__':
+  ### Parse command line arguments
+  parser = argparse.ArgumentParser(description="DM simulation -- Statistical analysis script")
+  parser.add_argument('input_dir', help='directory with simulation results')
+  parser.add_argument('context', help='data context; e.g., price, or reputation')
+  parser.add_argument('mode', help='transient or steady-state')
+  parser.add_argument('--confidence', dest='confidence', default=0.99,
+                      type=float, help='confidence value (default: 0.99)')
+  args = parser.parse_args()
+  input_dir = args.input_dir
+  context = args.context
+  mode = args.mode.lower()
+  confidence = args.confidence
+
+  ### Common params
+  # Ask for warm-up period index (if mode is steady-state)
+  window_size = 0
+  if mode == 'steady-state':
+    warmup = int(input('Warm-up period index: '))
+  elif mode == 'transient':
+    warmup = 0
+    window_size = int(input('Window size: '))
+  else:
+    sys.exit('Unknown mode specified.')
+  # File names and paths
+  files_by_name = {}
+  csv_roots = set()
+  npz_roots = set()
+  for root, _, files in os.walk(input_dir):
+    if 'transient' in root or 'steady-state' in root:
+      continue
+    for f in files:
+      if f.endswith(EXTENSION):
+        csv_roots.add(root)
+        if context in f:
+          files_by_name.setdefault(f[:-len(EXTENSION)], []).append(os.path.join(root, f))
+      elif f.endswith(NPZ_EXTENSION):
+        npz_roots.add(root)
+        fp = os.path.join(root, f)
+        with np.load(fp) as archive:
+          for key in archive.files:
+            if context in key:
+              files_by_name.setdefault(key, []).append((fp, key))
+  # A run directory holding results in both formats would count
+  # its replication twice
+  mixed = sorted(root for root in npz_roots
+                 if any(r == root or r.startswith(root + os.sep) for r in csv_roots))
+  if mixed:
+    sys.exit('Both CSV and npz results found in: {}'.format(', '.join(mixed)))
+
+  ### Merge results from files
+  # Each name is independent, so process them in parallel
+  names = list(files_by_name.keys())
+  num_names = len(names)
+  with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+    list(executor.map(process_name, names, [files_by_name[n] for n in names],
+                      [input_dir] * num_names, [mode] * num_names, [warmup] * num_names,
+                      [window_size] * num_names, [confidence] * num_names))
@@ -11,81 +11,138 @@ import simulator.modules.dm as dm
 import simulator.modules.sim as sim
 import logging
 import numpy as np
+import os
 import sys
 import time
+try:
+  import tomllib
+except ImportError:
+  # Python < 3.11 (pip install tomli)
+  import tomli as tomllib
 
 
-### Parse command line arguments
-parser = argparse.ArgumentParser(description="DM simulation -- Main script")
-parser.add_argument('sim_duration', metavar='simulation_duration',
-                    type=int, help='simulation duration in seconds')
-parser.add_argument('--id', dest='id', default=0,
-                    type=int, help='simulation run id (default: 0)')
-parser.add_argument('--seed', dest='seed', default=int(round(time.time())),
-                    type=int, help='seed for the PRNG (default: current system timestamp)')
-parser.add_argument('--save_dir', dest='save_dir', default='out',
-                    help='output directory')
-parser.add_argument('--log', dest='log_level', default='INFO',
-                    help='set logging level (default: INFO)')
-parser.add_argument('--logfile', dest='log_file', default=None,
-                    help='set output log file (default: None)')
-args = parser.parse_args()
-sim_duration = args.sim_duration
-sim_id = args.id
-seed = args.seed
-save_dir = args.save_dir
-log_level = args.log_level
-log_file = args.log_file
-
-### Logging
-numeric_level = getattr(logging, log_level.upper(), 'INFO')
-if not isinstance(numeric_level, int):
-  raise ValueError("Invalid log level: {}".format(log_level))
-logging.basicConfig(filename=log_file, level=numeric_level)
-logging.info("Simulation duration set to: {}".format(sim_duration))
-
-### Create simulation-specific scenario
-# Create Bidders
-bidders = [
-    dm.Bidder(10000, costs={dm.DMEventHandler.WEB_BROWSING: 0.5},
-      bidding_params={'method': 'myopic'}, reputation=0.0,
-      reputation_params={'method': 'lebodic', 'window_size': 5}),
-    dm.Bidder(10000, costs={dm.DMEventHandler.WEB_BROWSING: 0.5},
-      bidding_params={'method': 'myopic'}, reputation=0.0,
-      reputation_params={'method': 'lebodic', 'window_size': 5})] 
-# Service requests mean interarrival rate (per second)
-interarrival_rate = 1
-# Service requests constant duration (in seconds)
-duration = 2.5 * 60
-# Service types and bit-rates
-bitrates = {dm.DMEventHandler.WEB_BROWSING: 512}
-
-### Initialize
-# Create new simulation engine
-se = sim.SimulationEngine()
-# Use NumPy PRNG with custom seed
-prng = np.random.RandomState(seed)
-se.prng = prng
-logging.info("Seed value set to: {}".format(seed))
-# Create simulation specific event handler, and connect
-# it with the simulation engine
-event_handler = dm.DMEventHandler(se)
-se.event_handler = event_handler
-# Add bidders to simulation engine
-event_handler.bidders = bidders
-# Set modeled service types
-dm.DMEventHandler.BITRATES = bitrates
-# Set params
-event_handler.interarrival_rate = interarrival_rate
-event_handler.duration = duration
-event_handler.save_dir = save_dir
-event_handler.sim_id = sim_id
-
-### Simulate
-# Schedule finishing event
-se.stop(sim_duration)
-# Start simulating
-logging.info("Simulation started")
-se.start()
-logging.info("Simulation finished")
+# Default scenario file (next to this script)
+SCENARIO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenario.toml')
 
+
+def load_scenario(file_name):
+  """
+  Returns simulation-specific scenario read from a TOML file, with
+  service type keys converted to integers.
+
+  Arguments:
+  file_name -- Path to the scenario file
+  """
+  with open(file_name, 'rb') as f:
+    scenario = tomllib.load(f)
+  # The auction is defined for exactly two network operators
+  if len(scenario.get('bidder', [])) != 2:
+    raise ValueError("Scenario {} must define exactly 2 bidders, found {}".format(
+        file_name, len(scenario.get('bidder', []))))
+  scenario['bitrates'] = {int(k): v for k, v in scenario['bitrates'].items()}
+  for params in scenario['bidder']:
+    params['costs'] = {int(k): v for k, v in params['costs'].items()}
+  return scenario
+
+
+def run_simulation(sim_duration, seed, sim_id, save_dir, scenario_file=SCENARIO_FILE,
+    output_format='npz'):
+  """
+  Runs one simulation and saves its results.
+
+  Arguments:
+  sim_duration -- Simulation duration in seconds
+  seed -- Seed for the PRNG
+  sim_id -- Simulation run id
+  save_dir -- Output directory
+
+  Keyword arguments:
+  scenario_file -- Path to the scenario file
+  output_format -- Output format ('npz' or 'csv')
+  """
+  logging.info("Simulation duration set to: {}".format(sim_duration))
+  # Bidder IDs name the output files, hence restart them for every run
+  dm.Bidder.reset_id_counter()
+
+  ### Create simulation-specific scenario
+  scenario = load_scenario(scenario_file)
+  # Create Bidders
+  bidders = [dm.Bidder(**params) for params in scenario['bidder']]
+  # Service requests mean interarrival rate (per second)
+  interarrival_rate = scenario['interarrival_rate']
+  # Service requests constant duration (in seconds)
+  duration = scenario['duration']
+  # Service types and bit-rates
+  bitrates = scenario['bitrates']
+
+  ### Initialize
+  # Create new simulation engine
+  se = sim.SimulationEngine()
+  # Use NumPy PRNG (PCG64 generator) with custom seed
+  prng = np.random.default_rng(seed)
+  se.prng = prng
+  logging.info("Seed value set to: {}".format(seed))
+  # Set modeled service types (before the event handler reads them)
+  dm.DMEventHandler.BITRATES = bitrates
+  # Create simulation specific event handler, and connect
+  # it with the simulation engine
+  event_handler = dm.DMEventHandler(se)
+  se.event_handler = event_handler
+  # Add bidders to simulation engine
+  event_handler.bidders = bidders
+  # Set params
+  event_handler.interarrival_rate = interarrival_rate
+  event_handler.duration = duration
+  # Draw (about) all service requests of the simulation in one batch,
+  # up to 65536 draws; the handler refills the batch if exhausted
+  event_handler.batch_size = min(max(int(1.2 * interarrival_rate * sim_duration), 1), 1 << 16)
+  event_handler.save_dir = save_dir
+  event_handler.sim_id = sim_id
+  event_handler.output_format = output_format
+
+  ### Simulate
+  # Schedule finishing event
+  se.stop(sim_duration)
+  # Start simulating
+  logging.info("Simulation started")
+  se.start()
+  logging.info("Simulation finished")
+
+
+if __name__ == '__main__':
+  ### Parse command line arguments
+  parser = argparse.ArgumentParser(description="DM simulation -- Main script")
+  parser.add_argument('sim_duration', metavar='simulation_duration',
+                      type=int, help='simulation duration in seconds')
+  parser.add_argument('--id', dest='id', default=0,
+                      type=int, help='simulation run id (default: 0)')
+  parser.add_argument('--seed', dest='seed', default=int(round(time.time())),
+                      type=int, help='seed for the PRNG (default: current system timestamp)')
+  parser.add_argument('--save_dir', dest='save_dir', default='out',
+                      help='output directory')
+  parser.add_argument('--scenario', dest='scenario_file', default=SCENARIO_FILE,
+                      help='scenario file (default: scenario.toml)')
+  parser.add_argument('--format', dest='output_format', default='npz',
+                      choices=['npz', 'csv'], help='output format (default: npz)')
+  parser.add_argument('--log', dest='log_level', default='INFO',
+                      help='set logging level (default: INFO)')
+  parser.add_argument('--logfile', dest='log_file', default=None,
+                      help='set output log file (default: None)')
+  args = parser.parse_args()
+  sim_duration = args.sim_duration
+  sim_id = args.id
+  seed = args.seed
+  save_dir = args.save_dir
+  scenario_file = args.scenario_file
+  output_format = args.output_format
+  log_level = args.log_level
+  log_file = args.log_file
+
+  ### Logging
+  numeric_level = getattr(logging, log_level.upper(), 'INFO')
+  if not isinstance(numeric_level, int):
+    raise ValueError("Invalid log level: {}".format(log_level))
+  logging.basicConfig(filename=log_file, level=numeric_level)
+
+  ### Run
+  run_simulation(sim_duration, seed, sim_id, save_dir, scenario_file, output_format)
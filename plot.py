@@ -7,28 +7,33 @@ Created by Jakub Konka on 2012-10-08.
 Copyright (c) 2012 University of Strathclyde. All rights reserved.
 """
 import argparse
-from csv import DictReader
+import glob
 from itertools import cycle
-import matplotlib.pyplot as plt
+import numpy as np
 import os
 
 
 def load_data(search_phrase, input_dir):
   dct = {}
   ext = '.out'
-  file_names = [f[:f.find(ext)] for _, _, files in os.walk(input_dir) for f in files if f.endswith(ext)]
-  for fn in filter(lambda x: search_phrase in x, file_names):
-    dct[fn] = {}
-    with open(input_dir + '/' + fn + ext, 'rt') as f:
-      reader = DictReader(f)
-      for row in reader:
-        for key in row:
-          val = float(row[key]) if key != 'sr_number' else int(row[key])
-          dct[fn].setdefault(key,[]).append(val)
+  pattern = os.path.join(glob.escape(input_dir), '*' + glob.escape(search_phrase) + '*' + ext)
+  for fp in sorted(glob.iglob(pattern)):
+    fn = os.path.splitext(os.path.basename(fp))[0]
+    with open(fp, 'rt') as f:
+      header = f.readline().strip().split(',')
+      data = np.loadtxt(f, delimiter=',', dtype=np.float64, ndmin=2)
+    # Map column names to columns
+    dct[fn] = {key: data[:, i].astype(np.int64) if key == 'sr_number' else data[:, i]
+               for i, key in enumerate(header)}
   return dct
 
 def plot_with_ci(sub_dct, identifier, save_dir):
-  plt.figure()
+  # Import pyplot lazily (with the non-interactive backend), so that
+  # importing this module stays cheap
+  import matplotlib
+  matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
+  fig = plt.figure()
   plt.errorbar(sub_dct['sr_number'], sub_dct['mean'], yerr=sub_dct['ci'], fmt='ro')
   plt.xlabel('Service request')
   separator = identifier.find('_')
@@ -36,40 +41,47 @@ def plot_with_ci(sub_dct, identifier, save_dir):
   plt.ylabel(ylabel[0].upper() + ylabel[1:])
   plt.grid()
   plt.savefig(save_dir + '/' + identifier + '.pdf')
+  plt.close(fig)
 
 def plot_overlaid(dct, save_dir):
+  # Import pyplot lazily (see plot_with_ci)
+  import matplotlib
+  matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
   if len(dct.keys()) > 1:
-    plt.figure()
+    fig = plt.figure()
     legend = []
     styles = cycle(['-', '--', '_', ':'])
     for key in dct:
       plt.plot(dct[key]['sr_number'], dct[key]['mean'], next(styles))
       separator = key.find('_')
-      legend += [key[separator+1:]]
+      legend.append(key[separator+1:])
       ylabel = key[:separator] if separator != -1 else key
     plt.xlabel('Service request')
     plt.ylabel(ylabel[0].upper() + ylabel[1:])
     plt.legend(legend)
     plt.grid()
     plt.savefig(save_dir + '/' + ylabel + '.pdf')
+    plt.close(fig)
 
 
-### Parse command line arguments
-parser = argparse.ArgumentParser(description='DM simulation plotting script')
-parser.add_argument('input_dir', metavar='input_dir',
-                    help='input directory')
-parser.add_argument('context', metavar='context',
-                    help='data context; e.g., price, or reputation')
-args = parser.parse_args()
-input_dir = args.input_dir
-context = args.context
+if __name__ == '__main__':
+  ### Parse command line arguments
+  parser = argparse.ArgumentParser(description='DM simulation plotting script')
+  parser.add_argument('input_dir', metavar='input_dir',
+                      help='input directory')
+  parser.add_argument('context', metavar='context',
+                      help='data context; e.g., price, or reputation')
+  args = parser.parse_args()
+  input_dir = args.input_dir
+  context = args.context
 
-### Load and plot
-# Load context data from files
-dct = load_data(context, input_dir)
-# Plot
-# Figure 1..k=num of bidders: data with confidence intervals
-for key in dct:
-  plot_with_ci(dct[key], key, input_dir)
-# Figure k+1: all data same plot
-plot_overlaid(dct, input_dir)
+  ### Load and plot
+  # Load context data from files
+  dct = load_data(context, input_dir)
+  # Plot
+  # Figure 1..k=num of bidders: data with confidence intervals
+  for key in dct:
+    plot_with_ci(dct[key], key, input_dir)
+  # Figure k+1: all data same plot
+  plot_overlaid(dct, input_dir)
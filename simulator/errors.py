@@ -11,7 +11,7 @@ class Error(Exception):
   """
   Base class for exceptions in this package.
   """
-  pass
+  __slots__ = ()
 
 
 class UnknownMethodError(Error):
@@ -23,18 +23,28 @@ class UnknownMethodError(Error):
   Attributes:
   params -- Params for which the error occurred
   """
+  __slots__ = ('params',)
+
   def __init__(self, params):
-    super().__init__(
-        "Cannot infer the method from params: {}".format(params)
-        )
+    # Keep params as the sole argument (so the exception still
+    # pickles); the message is only formatted when rendered
+    super().__init__(params)
     self.params = params
 
+  def __str__(self):
+    """
+    Returns error message for the params.
+    """
+    return "Cannot infer the method from params: {}".format(self.params)
+
 
 class UninitializedArgumentError(Error):
   """
   Exception raised for uninitialized keyword arguments
   in a method.
   """
+  __slots__ = ()
+
   def __init__(self):
     super().__init__("Uninitialized argument found")
 
@@ -6,17 +6,55 @@ dm.py
 Created by Jakub Konka on 2012-08-22.
 Copyright (c) 2012 University of Strathclyde. All rights reserved.
 """
-import csv
+import collections
 import functools
+import itertools
 import logging
-import matplotlib.pyplot as plt
 import numpy as np
 import os
-import re
 import simulator.errors as errors
+import simulator.modules.kernels as kernels
 import simulator.modules.sim as sim
-import unittest
-import warnings
+
+
+@functools.lru_cache(maxsize=256)
+def _estimate_bid_hat_function(w, reps, granularity=1000):
+  """
+  Returns equilibrium bidding strategy function (bids-hat) sampled
+  at granularity points, as arrays of bids and corresponding costs.
+  Recent results are cached, since with windowed reputation updates
+  the same price weight and reputations recur across auctions (each
+  entry holds two granularity-sized arrays, hence the small cache).
+
+  Arguments:
+  w -- Price weight
+  reps -- Tuple of network operators' reputations
+
+  Keyword arguments:
+  granularity -- Number of sampling points
+  """
+  # Calculate params
+  v1 = [(1-w)*reps[0], (1-w)*reps[0] + w]
+  v2 = [(1-w)*reps[1], (1-w)*reps[1] + w]
+  # Account for numerical imprecission
+  my_round = lambda x: round(x, 6)
+  v1 = list(map(my_round, v1))
+  v2 = list(map(my_round, v2))
+  # Check whether trivial NE
+  if v2[1] >= v1[1] and v1[1] <= 2*v2[0] - v2[1]:
+    graph_vf = np.linspace(v1[0], v1[1], granularity)
+    bids = np.full(granularity, v2[0])
+  elif v2[1] < v1[1] and v2[1] <= 2*v1[0] - v1[1]:
+    graph_vf = np.linspace(v1[0], v1[1], granularity)
+    bids = graph_vf
+  else:
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+      bids, graph_vf = kernels.bid_hat(v1[0], v1[1], v2[0], v2[1], granularity)
+  # Cached samples are shared between callers, hence read-only
+  bids, graph_vf = np.asarray(bids, dtype=np.float64), np.asarray(graph_vf, dtype=np.float64)
+  bids.setflags(write=False)
+  graph_vf.setflags(write=False)
+  return bids, graph_vf
 
 
 class BidderHelper:
@@ -43,6 +81,9 @@ class BidderHelper:
           'params': []
           },
         }
+    # Initialize scratch buffer for the myopic bid search (reused
+    # across auctions; resized if the bids-hat granularity changes)
+    self._scratch = np.empty(1000)
 
   def method(self, params):
     """
@@ -74,63 +115,13 @@ class BidderHelper:
     reputation -- Network operator's reputation
     enemy_reputation -- Other network operator's reputation
     """
-    def estimate_bid_hat_function(w, reps, granularity=1000):
-      warnings.simplefilter('error', RuntimeWarning)
-      # Calculate params
-      v1 = [(1-w)*reps[0], (1-w)*reps[0] + w]
-      v2 = [(1-w)*reps[1], (1-w)*reps[1] + w]
-      # Account for numerical imprecission
-      my_round = lambda x: round(x, 6)
-      v1 = list(map(my_round, v1))
-      v2 = list(map(my_round, v2))
-      # Check whether nontrivial NE
-      if (v2[1] >= v1[1]):
-        if (v1[1] <= 2*v2[0] - v2[1]):
-          graph_vf = np.linspace(v1[0], v1[1], granularity)
-          bids = list(map(lambda x: v2[0], graph_vf))
-        else:
-          # Bid bounds
-          b = [(4 * v1[0] * v2[0] - (v1[1] + v2[1])**2) / (4 * (v1[0] - v1[1] + v2[0] - v2[1])), (v1[1] + v2[1]) / 2]
-          # Constants of integration
-          c1 = ((v2[1]-v1[1])**2 + 4*(b[0]-v2[1])*(v1[0]-v1[1])) / (-2*(b[0]-b[1])*(v1[0]-v1[1])) * np.exp((v2[1]-v1[1]) / (2*(b[0]-b[1])))
-          c2 = ((v1[1]-v2[1])**2 + 4*(b[0]-v1[1])*(v2[0]-v2[1])) / (-2*(b[0]-b[1])*(v2[0]-v2[1])) * np.exp((v1[1]-v2[1]) / (2*(b[0]-b[1])))
-          # Inverse bid function
-          def vf(x):
-            try:
-              return v1[1] + (v2[1]-v1[1])**2 / (c1*(v2[1]+v1[1]-2*x)*np.exp((v2[1]-v1[1])/(v2[1]+v1[1]-2*x)) + 4*(v2[1]-x))
-            except RuntimeWarning as e:
-              if (re.search('.*overflow encountered in exp.*', str(e)) or
-                 re.search('.*divide by zero encountered in double_scalars.*', str(e))):
-                return v1[1]
-              else:
-                raise RuntimeWarning(e)
-          # Sampling
-          bids = np.linspace(b[0], b[1], granularity)
-          graph_vf = list(map(vf, bids))
-      else:
-        if (v2[1] <= 2*v1[0] - v1[1]):
-          graph_vf = np.linspace(v1[0], v1[1], granularity)
-          bids = graph_vf
-        else:
-          # Bid bounds
-          b = [(4 * v1[0] * v2[0] - (v1[1] + v2[1])**2) / (4 * (v1[0] - v1[1] + v2[0] - v2[1])), (v1[1] + v2[1]) / 2]
-          # Constants of integration
-          c1 = ((v2[1]-v1[1])**2 + 4*(b[0]-v2[1])*(v1[0]-v1[1])) / (-2*(b[0]-b[1])*(v1[0]-v1[1])) * np.exp((v2[1]-v1[1]) / (2*(b[0]-b[1])))
-          c2 = ((v1[1]-v2[1])**2 + 4*(b[0]-v1[1])*(v2[0]-v2[1])) / (-2*(b[0]-b[1])*(v2[0]-v2[1])) * np.exp((v1[1]-v2[1]) / (2*(b[0]-b[1])))
-          # Inverse bid functions
-          vf = lambda x: (v1[1] + (v2[1]-v1[1])**2 / (c1*(v2[1]+v1[1]-2*x)*np.exp((v2[1]-v1[1])/(v2[1]+v1[1]-2*x)) + 4*(v2[1]-x))
-                if x <= b[1] else x)
-          # Sampling
-          bids = np.linspace(b[0], v1[1], granularity)
-          graph_vf = list(map(vf, bids))
-      return bids, graph_vf
-
     if price_weight != 0.0 and price_weight != 1.0 and reputation != enemy_reputation:
       # Estimate equilibrium bidding strategy functions (bids-hat)
-      bids_hat, costs_hat = estimate_bid_hat_function(price_weight, [reputation, enemy_reputation])
+      bids_hat, costs_hat = _estimate_bid_hat_function(price_weight, (reputation, enemy_reputation))
       # Calculate bid
-      dist = list(map(lambda x: np.abs(x - ((1-price_weight)*reputation + cost*price_weight)), costs_hat))
-      return (bids_hat[dist.index(min(dist))] - (1-price_weight)*reputation) / price_weight
+      if self._scratch.size != costs_hat.size:
+        self._scratch = np.empty(costs_hat.size)
+      return kernels.myopic_bid(bids_hat, costs_hat, price_weight, cost, reputation, self._scratch)
     elif price_weight == 0.0:
       # Return the highest possible bid
       return float('inf')
@@ -149,7 +140,13 @@ class BidderHelper:
     success_list -- Current user's success report list
     """
     if len(success_list) >= window_size:
-      return 1 - (sum(success_list[len(success_list)-window_size:]) / window_size)
+      if isinstance(success_list, SuccessList) and success_list.maxlen == window_size:
+        # The list holds exactly the window; use its running count
+        successes = success_list.successes
+      else:
+        # Sum the latest window_size reports (deques do not slice)
+        successes = sum(itertools.islice(reversed(success_list), window_size))
+      return 1 - (successes / window_size)
     else:
       return reputation
 
@@ -170,6 +167,102 @@ class BidderHelper:
       return reputation + penalty if reputation + penalty <= 1.0 else 1.0
 
 
+class GrowableArray:
+  """
+  Represents one-dimensional NumPy array supporting amortized
+  O(1) appends (capacity is doubled whenever exhausted).
+  """
+  def __init__(self, dtype=np.float64, capacity=1024):
+    """
+    Constructs GrowableArray instance.
+
+    Keyword arguments:
+    dtype -- Data type of the elements
+    capacity -- Initial capacity
+    """
+    self._data = np.empty(capacity, dtype=dtype)
+    self._size = 0
+
+  def __len__(self):
+    """
+    Returns number of appended elements.
+    """
+    return self._size
+
+  def __repr__(self):
+    """
+    Returns string representation of the appended elements.
+    """
+    return repr(self.values.tolist())
+
+  def __getitem__(self, key):
+    """
+    Returns element(s) of the appended elements.
+
+    Arguments:
+    key -- Index or slice
+    """
+    return self._data[:self._size][key]
+
+  @property
+  def values(self):
+    """
+    Returns view of the appended elements.
+    """
+    return self._data[:self._size]
+
+  def append(self, value):
+    """
+    Appends value to the end of the array.
+
+    Arguments:
+    value -- Value to append
+    """
+    if self._size == self._data.size:
+      data = np.empty(max(2 * self._data.size, 1), dtype=self._data.dtype)
+      data[:self._size] = self._data
+      self._data = data
+    self._data[self._size] = value
+    self._size += 1
+
+
+class SuccessList(collections.deque):
+  """
+  Represents user success report list (deque of 0/1 reports), which
+  keeps running count of the successes it holds.
+  """
+  def __init__(self, iterable=(), maxlen=None):
+    """
+    Constructs SuccessList instance.
+
+    Keyword arguments:
+    iterable -- Initial reports
+    maxlen -- Maximum number of retained (latest) reports
+    """
+    super().__init__(iterable, maxlen)
+    self.successes = sum(self)
+
+  def __reduce__(self):
+    """
+    Returns constructor arguments for copy and pickle (the running
+    count is recomputed from the reports).
+    """
+    return type(self), (list(self), self.maxlen)
+
+  def append(self, report):
+    """
+    Appends report to the end of the list, dropping the oldest
+    report if the list is full.
+
+    Arguments:
+    report -- User success report (1 if successful; 0 otherwise)
+    """
+    if len(self) == self.maxlen:
+      self.successes -= self[0]
+    super().append(report)
+    self.successes += report
+
+
 class Bidder:
   """
   Represents network operator in the Digital Marketplace.
@@ -209,12 +302,13 @@ class Bidder:
     self._available_bitrate = total_bitrate
     # Assign reputation rating update method
     self._reputation_update_method = self._bidder_helper.method(reputation_params)
-    # Initialize reputation history list
-    self._reputation_history = []
-    # Initialize winnings history list
-    self._winning_history = []
-    # Initialize user success report list
-    self._success_list = []
+    # Initialize reputation history array
+    self._reputation_history = GrowableArray(dtype=np.float64)
+    # Initialize winnings history array
+    self._winning_history = GrowableArray(dtype=np.int64)
+    # Initialize user success report list; only the reports within
+    # the reputation window (if any) are retained
+    self._success_list = SuccessList(maxlen=reputation_params.get('window_size'))
     # Initialize dictionary of service dedicated bitrates
     self._dedicated_bitrates = {}
   
@@ -223,6 +317,15 @@ class Bidder:
     Returns string representation of the object.
     """
     return "Bidder_" + str(self._id)
+
+  @classmethod
+  def reset_id_counter(cls):
+    """
+    Resets ID counter, so that IDs of subsequently constructed
+    instances start at 0 (e.g., when running several simulations
+    in one process).
+    """
+    cls._id_counter = 0
   
   @property
   def id(self):
@@ -250,14 +353,14 @@ class Bidder:
     """
     Returns reputation history.
     """
-    return self._reputation_history
+    return self._reputation_history.values
   
   @property
   def winning_history(self):
     """
     Returns winning history.
     """
-    return self._winning_history
+    return self._winning_history.values
   
   @property
   def total_bitrate(self):
@@ -278,7 +381,7 @@ class Bidder:
     """
     Returns user success list.
     """
-    return self._success_list
+    return list(self._success_list)
   
   def _generate_cost(self, service_type):
     """
@@ -305,23 +408,26 @@ class Bidder:
     """
     # Generate cost for service type
     self._generate_cost(service_type)
-    # Save current reputation
-    self._reputation_history += [self._reputation]
     # Submit bid
-    return self._bidding_method(price_weight, self.costs[service_type], self.reputation, enemy_reputation)
+    return self._bidding_method(price_weight, self._costs[service_type], self._reputation, enemy_reputation)
   
+  def update_reputation_history(self):
+    """
+    Updates reputation history with the current reputation.
+    """
+    self._reputation_history.append(self._reputation)
+
   def update_winning_history(self, has_won):
     """
-    Updates winning history list.
+    Updates winning history.
     
     Arguments:
     has_won -- True if won current auction; false otherwise
     """
-    value = 1 if has_won else 0
-    if self._winning_history:
-      self._winning_history += [self._winning_history[-1] + value]
-    else:
-      self._winning_history += [value]
+    value = int(has_won)
+    if len(self._winning_history) > 0:
+      value += self._winning_history[-1]
+    self._winning_history.append(value)
  
   def _update_available_bitrate(self, sr_number, service_type=None):
     """
@@ -341,13 +447,13 @@ class Bidder:
       else:
         self._dedicated_bitrates[sr_number] = self._available_bitrate
         self._available_bitrate = 0
-      logging.debug("{} => service no. {} dedicated bit-rate: {}".format(self, sr_number, self._dedicated_bitrates[sr_number]))
+      logging.debug("%s => service no. %s dedicated bit-rate: %s", self, sr_number, self._dedicated_bitrates[sr_number])
     else:
       sr_bitrate = self._dedicated_bitrates[sr_number]
       del self._dedicated_bitrates[sr_number]
       self._available_bitrate += sr_bitrate
-      logging.debug("{} => service no. {} dedicated bit-rate: {}".format(self, sr_number, sr_bitrate))
-    logging.debug("{} => available bit-rate: {}".format(self, self._available_bitrate))
+      logging.debug("%s => service no. %s dedicated bit-rate: %s", self, sr_number, sr_bitrate)
+    logging.debug("%s => available bit-rate: %s", self, self._available_bitrate)
 
   def _update_success_list(self, service_type):
     """
@@ -357,11 +463,11 @@ class Bidder:
     service_type -- Type of the requested service
     """
     if self._available_bitrate >= DMEventHandler.BITRATES[service_type]:
-      self._success_list += [1]
+      self._success_list.append(1)
     else:
-      self._success_list += [0]
-    logging.debug("{} => latest user success report: {}".format(self, self._success_list[-1]))
-    logging.debug("{} => user success report list: {}".format(self, self._success_list))
+      self._success_list.append(0)
+    logging.debug("%s => latest user success report: %s", self, self._success_list[-1])
+    logging.debug("%s => user success report list: %s", self, self._success_list)
 
   def service_request(self, sr_number, service_type):
     """
@@ -371,14 +477,14 @@ class Bidder:
     sr_number -- Auction (SR) number
     service_type -- Type of the requested service
     """ 
-    logging.debug("{} => service type: {}".format(self, service_type))
+    logging.debug("%s => service type: %s", self, service_type)
     # Store user success report
     self._update_success_list(service_type)
     # Update available bitrate
     self._update_available_bitrate(sr_number, service_type=service_type)
     # Compute reputation rating update
     self._reputation = self._reputation_update_method(self._reputation, self._success_list)
-    logging.debug("{} => reputation: {}".format(self, self._reputation))
+    logging.debug("%s => reputation: %s", self, self._reputation)
   
   def finish_servicing_request(self, sr_number):
     """
@@ -423,17 +529,35 @@ class DMEventHandler(sim.EventHandler):
     self.save_dir = ""
     # Initialize simulation id
     self.sim_id = -1
+    # Initialize output format ('csv' or 'npz')
+    self.output_format = 'npz'
     # Initialize service request counter
     self._sr_count = 0
     # Initialize prices history dictionary
     self._prices = {service_type: {} for service_type in DMEventHandler.BITRATES.keys()}
     # Initialize price weight space (discretized interval [0,1])
     self._w_space = np.linspace(0.01, 1, 100)
+    # Initialize array of modeled service types
+    self._service_types = np.array(list(DMEventHandler.BITRATES.keys()))
+    # Initialize number of service request events generated per batch
+    self.batch_size = 4096
+    # Initialize pregenerated service request draws (arrival times,
+    # price weights and service types), and index of the next one
+    self._sr_times = np.empty(0)
+    self._sr_price_weights = np.empty(0)
+    self._sr_service_types = np.empty(0, dtype=np.int64)
+    self._sr_index = 0
  
   def handle_start(self):
     """
     Overriden
     """
+    # Refresh modeled service types and prices history (BITRATES may
+    # have been reassigned after construction)
+    self._service_types = np.array(list(DMEventHandler.BITRATES.keys()))
+    self._prices = {service_type: {} for service_type in DMEventHandler.BITRATES.keys()}
+    self._sr_times = np.empty(0)
+    self._sr_index = 0
     self._schedule_sr_event(self._simulation_engine.simulation_time)
  
   def handle_stop(self):
@@ -447,7 +571,7 @@ class DMEventHandler(sim.EventHandler):
     """
     Overriden
     """
-    logging.debug("{} @ Received event => {}".format(self._simulation_engine.simulation_time, event.identifier))
+    logging.debug("%s @ Received event => %s", self._simulation_engine.simulation_time, event.identifier)
     if event.identifier == DMEventHandler.SR_EVENT:
       # Run auction
       self._run_auction(event)
@@ -463,19 +587,39 @@ class DMEventHandler(sim.EventHandler):
 
   def _generate_sr_event(self, base_time):
     """
-    Returns next service request (SR) event.
+    Returns next service request (SR) event built from the
+    pregenerated draws; generates new batch of draws if the
+    pregenerated ones are exhausted.
 
     Arguments:
-    base_time -- Base time for the next event to occur
+    base_time -- Base time of a new batch; only used when the batch
+                 is generated, since pregenerated draws already
+                 carry their (accumulated) arrival times
+    """
+    if self._sr_index >= self._sr_times.size:
+      self._refill_sr_events(base_time)
+    i = self._sr_index
+    self._sr_index += 1
+    bundle = (self._sr_price_weights[i].item(), self._sr_service_types[i].item())
+    return sim.Event(DMEventHandler.SR_EVENT, self._sr_times[i].item(), bundle=bundle)
+
+  def _refill_sr_events(self, base_time):
+    """
+    Generates batch of draws for consecutive service request (SR)
+    events; the events themselves are built one at a time.
+
+    Arguments:
+    base_time -- Base time for the first event to occur
     """
     prng = self._simulation_engine.prng
-    # Generate buyer (service type & price weight pair)
-    price_weight = float(prng.choice(self._w_space, 1)[0])
-    service_type = prng.choice(list(DMEventHandler.BITRATES.keys()), 1)[0]
-    # Calculate interarrival time
-    delta_time = prng.exponential(1 / self.interarrival_rate)
-    # Generate next service request event
-    return sim.Event(DMEventHandler.SR_EVENT, base_time + delta_time, bundle=(price_weight, service_type))
+    n = self.batch_size
+    # Generate buyers (service type & price weight pairs)
+    self._sr_price_weights = self._w_space[prng.integers(self._w_space.size, size=n)]
+    self._sr_service_types = self._service_types[prng.integers(self._service_types.size, size=n)]
+    # Calculate arrival times (accumulated one interarrival time at a time)
+    delta_times = prng.exponential(size=n) / self.interarrival_rate
+    self._sr_times = np.add.accumulate(np.concatenate(([base_time], delta_times)))[1:]
+    self._sr_index = 0
 
   def _schedule_sr_event(self, base_time):
     """
@@ -522,13 +666,14 @@ class DMEventHandler(sim.EventHandler):
     # Get requested price weight and service type
     price_weight, service_type = event.kwargs.get('bundle', None)
     # Select the winner
-    winner = self._select_winner(service_type, price_weight)
-    loser = functools.reduce(lambda acc, x: acc + [x] if x is not winner else acc, self.bidders, [])
+    winner, win_bid = self._select_winner(service_type, price_weight)
     # Collect statistics & update system state
-    win_bid = winner.submit_bid(service_type, price_weight, loser[0].reputation)
-    self._prices[service_type].setdefault(price_weight, []).append(win_bid)
+    if price_weight not in self._prices[service_type]:
+      self._prices[service_type][price_weight] = GrowableArray(np.float64)
+    self._prices[service_type][price_weight].append(win_bid)
     for b in self.bidders:
-      b.update_winning_history(True if b == winner else False)
+      b.update_reputation_history()
+      b.update_winning_history(b is winner)
     winner.service_request(self._sr_count, service_type)
     # Schedule termination event
     self._schedule_st_event(event.time, (winner, self._sr_count))
@@ -536,27 +681,27 @@ class DMEventHandler(sim.EventHandler):
   def _select_winner(self, service_type, price_weight):
     """
     Returns winner of an auction characterized by parameters
-    service_type and price_weight.
+    service_type and price_weight, and the winning bid.
 
     Arguments:
     service_type -- Type of the requested service
     price_weight -- Requested price weight
     """
+    bidder0, bidder1 = self.bidders
+    reputation0, reputation1 = bidder0.reputation, bidder1.reputation
     # Get bids from bidders
-    bids = [self.bidders[0].submit_bid(service_type, price_weight, self.bidders[1].reputation)]
-    bids += [self.bidders[1].submit_bid(service_type, price_weight, self.bidders[0].reputation)]
+    bids = [bidder0.submit_bid(service_type, price_weight, reputation1),
+            bidder1.submit_bid(service_type, price_weight, reputation0)]
     # Select the winner
-    compound_bids = [price_weight*bids[i] + (1-price_weight)*self.bidders[i].reputation for i in range(2)]
-    if compound_bids[0] < compound_bids[1]:
-      # Bidder 1 wins
-      winner = 0
-      return self.bidders[0]
-    elif compound_bids[0] > compound_bids[1]:
-      # Bidder 2 wins
-      return self.bidders[1]
-    else:
+    compound_bid0 = price_weight*bids[0] + (1-price_weight)*reputation0
+    compound_bid1 = price_weight*bids[1] + (1-price_weight)*reputation1
+    if compound_bid0 == compound_bid1:
       # Tie
-      return self.bidders[self._simulation_engine.prng.randint(2)]
+      index = self._simulation_engine.prng.integers(2)
+    else:
+      # Bidder with the lowest compound bid wins
+      index = 0 if compound_bid0 < compound_bid1 else 1
+    return self.bidders[index], bids[index]
 
   def _save_results(self):
     """
@@ -566,30 +711,57 @@ class DMEventHandler(sim.EventHandler):
     path = self.save_dir + '/' + str(self.sim_id)
     if not os.path.exists(path):
       os.makedirs(path)
+    if self.output_format == 'npz':
+      self._save_results_npz(path)
+      return
     # Write output data to files
     for b in self.bidders:
       # 1. Reputation history
-      with open(path + '/reputation_{}.out'.format(str(b).lower()), mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f, delimiter=',')
-        writer.writerow(['sr_number', 'reputation'])
-        for tup in zip(range(1, self._sr_count+1), b.reputation_history):
-          writer.writerow(tup)
+      self._save_series(path + '/reputation_{}.out'.format(str(b).lower()),
+          'reputation', b.reputation_history[:self._sr_count], '%.17g')
       # 2. History of won auctions (market share)
-      with open(path + '/winnings_{}.out'.format(str(b).lower()), mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f, delimiter=',')
-        writer.writerow(['sr_number', 'winnings'])
-        for tup in zip(range(1, self._sr_count+1), b.winning_history):
-          writer.writerow(tup)
+      self._save_series(path + '/winnings_{}.out'.format(str(b).lower()),
+          'winnings', b.winning_history[:self._sr_count], '%d')
     # 3. Prices per service type and price weight
-    logging.debug("Price dict: {}".format(self._prices))
+    logging.debug("Price dict: %s", self._prices)
     path += '/prices'
     if not os.path.exists(path):
       os.makedirs(path)
     for st_dct in self._prices:
       for w in self._prices[st_dct]:
-        with open(path + '/price_{}_{}.out'.format(st_dct, w), mode='w', newline='', encoding='utf-8') as f:
-          writer = csv.writer(f, delimiter=',')
-          writer.writerow(['sr_number', 'price'])
-          for tup in zip(range(1, len(self._prices[st_dct][w]) + 1), self._prices[st_dct][w]):
-            writer.writerow(tup)
+        self._save_series(path + '/price_{}_{}.out'.format(st_dct, w),
+            'price', self._prices[st_dct][w].values, '%.17g')
+
+  def _save_results_npz(self, path):
+    """
+    Saves results of the simulation to a single binary NumPy archive,
+    one array per series named like the corresponding CSV file
+    (service request numbers are implied by array position).
 
+    Arguments:
+    path -- Output directory
+    """
+    series = {}
+    for b in self.bidders:
+      series['reputation_{}'.format(str(b).lower())] = b.reputation_history[:self._sr_count]
+      series['winnings_{}'.format(str(b).lower())] = b.winning_history[:self._sr_count]
+    for st_dct in self._prices:
+      for w in self._prices[st_dct]:
+        series['price_{}_{}'.format(st_dct, w)] = self._prices[st_dct][w].values
+    np.savez(path + '/results.npz', **series)
+
+  def _save_series(self, file_path, name, values, fmt):
+    """
+    Saves series of values, indexed by consecutive service request
+    numbers starting at 1, to a CSV file.
+
+    Arguments:
+    file_path -- Path of the output file
+    name -- Column name of the values
+    values -- Sequence of values
+    fmt -- Format of the values
+    """
+    values = np.asarray(values)
+    sr_numbers = np.arange(1, values.size + 1)
+    np.savetxt(file_path, np.column_stack((sr_numbers, values)), fmt=['%d', fmt],
+        delimiter=',', header='sr_number,' + name, comments='', encoding='utf-8')
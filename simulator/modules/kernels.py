@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+kernels.py
+
+Numerical kernels of the DM simulation. myopic_bid is compiled with
+numba if it is installed, and run as plain NumPy code otherwise; it
+only subtracts, takes absolute values and compares, so both give the
+same results. bid_hat is always plain NumPy: numba's exp differs from
+NumPy's vectorized exp in the last place for some inputs, which would
+make seeded results depend on whether numba is installed.
+"""
+import numpy as np
+
+
+try:
+  from numba import njit
+except ImportError:
+  def njit(*args, **kwargs):
+    """
+    Fallback for numba.njit when numba is not installed;
+    returns the decorated function unchanged.
+    """
+    return lambda func: func
+
+
+def bid_hat(v1_lo, v1_hi, v2_lo, v2_hi, granularity):
+  """
+  Returns sampled bids-hat and corresponding costs for the nontrivial
+  NE. Points at which the inverse bid function overflows or divides
+  by zero are mapped to v1_hi; if v2_hi < v1_hi, the inverse bid
+  function is the identity above the upper bid bound.
+
+  Arguments:
+  v1_lo, v1_hi -- Bounds of the first network operator's values
+  v2_lo, v2_hi -- Bounds of the other network operator's values
+  granularity -- Number of sampling points
+  """
+  dv = v2_hi - v1_hi
+  sv = v1_hi + v2_hi
+  # Bid bounds
+  b_lo = (4 * v1_lo * v2_lo - sv**2) / (4 * (v1_lo - v1_hi + v2_lo - v2_hi))
+  b_hi = sv / 2
+  db = b_lo - b_hi
+  # Constant of integration
+  c1 = (dv**2 + 4*(b_lo-v2_hi)*(v1_lo-v1_hi)) / (-2*db*(v1_lo-v1_hi)) * np.exp(dv / (2*db))
+  # Sampling of the inverse bid function
+  bids = np.linspace(b_lo, b_hi if v2_hi >= v1_hi else v1_hi, granularity)
+  denominator = sv - 2*bids
+  exponent = dv / denominator
+  vals = v1_hi + dv**2 / (c1*denominator*np.exp(exponent) + 4*(v2_hi-bids))
+  graph_vf = np.where(np.isfinite(exponent) & np.isfinite(vals), vals, v1_hi)
+  if v2_hi < v1_hi:
+    graph_vf = np.where(bids <= b_hi, graph_vf, bids)
+  return bids, graph_vf
+
+
+@njit(cache=True)
+def myopic_bid(bids_hat, costs_hat, price_weight, cost, reputation, scratch):
+  """
+  Returns myopic bid, i.e., the bid-hat whose cost is the closest
+  to the network operator's weighted cost.
+
+  Arguments:
+  bids_hat -- Sampled equilibrium bids
+  costs_hat -- Costs corresponding to bids_hat
+  price_weight -- Subscriber's price weight (nonzero)
+  cost -- Network operator's cost
+  reputation -- Network operator's reputation
+  scratch -- Preallocated array of the same size as costs_hat (overwritten)
+  """
+  weighted_reputation = (1-price_weight)*reputation
+  target = weighted_reputation + cost*price_weight
+  # Distances to the target, computed in place
+  np.subtract(costs_hat, target, scratch)
+  np.abs(scratch, scratch)
+  index = np.argmin(scratch)
+  return (bids_hat[index] - weighted_reputation) / price_weight
@@ -3,6 +3,8 @@
 
 from abc import abstractmethod, ABCMeta
 import datetime
+import heapq
+import itertools
 import random
 import time
 import unittest
@@ -76,6 +78,10 @@ class Event:
   """
   Represents an abstract event.
   """
+  # Events are created once per service request and termination;
+  # fixed slots avoid a per-instance attribute dict
+  __slots__ = ('_identifier', '_time', '_kwargs')
+
   def __init__(self, identifier, time, **kwargs):
     """
     Constructs Event instance
@@ -174,8 +180,12 @@ class SimulationEngine:
     """
     Constructs SimulationEngine instance
     """
-    # Create empty event list
+    # Create empty event list; kept as a binary heap of
+    # (time, sequence number, event) entries, where the sequence
+    # number breaks ties between events scheduled for the same time
+    # in the order they were scheduled
     self._event_list = []
+    self._sequence = itertools.count()
     # Initialize current simulation time
     self.simulation_time = 0
     # Initialize finish time
@@ -202,7 +212,7 @@ class SimulationEngine:
     # Traverse the event list
     while len(self._event_list) > 0:
       # Remove the imminent event from the event list
-      imminent = self._event_list.pop()
+      _, _, imminent = heapq.heappop(self._event_list)
       # Advance clock to the imminent event
       self.simulation_time = imminent.time
       # Notify of the current event
@@ -222,7 +232,7 @@ class SimulationEngine:
       # Set finish time
       self._finish_time = finish_time
       # Schedule finishing event
-      self._event_list += [Event(self.END_EVENT, self._finish_time)]
+      heapq.heappush(self._event_list, (self._finish_time, next(self._sequence), Event(self.END_EVENT, self._finish_time)))
       self._finish_event_exists = True
   
   def schedule(self, event):
@@ -235,10 +245,7 @@ class SimulationEngine:
     # Discard new event if happens after the finishing event
     if event.time < self._finish_time:
       # Add the event to the event list
-      self._event_list += [event]
-      # Sort the list in a LIFO style
-      self._event_list.sort(key=lambda x: x.time)
-      self._event_list.reverse()
+      heapq.heappush(self._event_list, (event.time, next(self._sequence), event))
   
   def register_callback(self, func, ttype):
     """
@@ -248,7 +255,7 @@ class SimulationEngine:
     func -- Function to call back
     ttype -- Type of the callback
     """
-    self._callback_dict[ttype] += [func]
+    self._callback_dict[ttype].append(func)
   
   def _notify_start(self):
     """
@@ -6,14 +6,27 @@ dm.py
 Created by Jakub Konka on 2013-01-07.
 Copyright (c) 2013 University of Strathclyde. All rights reserved.
 """
+import copy
 import functools
 import numpy as np
+import os.path
+import pickle
 import simulator.errors as errors
-from simulator.modules.dm import BidderHelper, Bidder, DMEventHandler
+from simulator.modules.dm import BidderHelper, GrowableArray, SuccessList, Bidder, DMEventHandler
 from simulator.modules.sim import SimulationEngine, Event
+import tempfile
 import unittest
 
 
+# Theoretical cost-to-bid mapping for the remaining cases of myopic
+# bidding (see BidderHelperTests.test_myopic_bidding_for_remaining_cases);
+# computed once, the cost is singular at the upper bid bound of 13/16
+_TH_BIDS = np.linspace(145/(32*8), 13/16, 1000)
+with np.errstate(divide='ignore', invalid='ignore'):
+  _TH_COSTS = np.where(_TH_BIDS == 13/16, 0.75,
+      0.75 + 1 / ((13*8 - 128*_TH_BIDS) * (-(81*2)/63) * np.exp(-16/63 + 1/(13-16*_TH_BIDS)) + 4*(7*8 - 64*_TH_BIDS)))
+
+
 class BidderHelperTests(unittest.TestCase):
   def setUp(self):
     self.helper = BidderHelper()
@@ -62,14 +75,7 @@ class BidderHelperTests(unittest.TestCase):
   def test_myopic_bidding_for_remaining_cases(self):
     price_weight = 0.5
     bid = self.helper.myopic_bidding(price_weight, self.cost, self.reputation, 0.75)
-    def th_cost(bid):
-      if bid == 13/16:
-        return 0.75
-      else:
-        return 0.75 + 1 / ((13*8 - 128*bid) * (-(81*2)/63) * np.exp(-16/63 + 1/(13-16*bid)) + 4*(7*8 - 64*bid))
-    th_bids = np.linspace(145/(32*8), 13/16, 1000)
-    diff = list(map(lambda x: np.abs(x-0.5), map(th_cost, th_bids)))
-    th_bid = th_bids[diff.index(min(diff))]
+    th_bid = _TH_BIDS[np.argmin(np.abs(_TH_COSTS - 0.5))]
     self.assertEqual(bid, (th_bid - price_weight * self.cost)/price_weight)
 
   def test_lebodics_reputation_update(self):
@@ -93,6 +99,50 @@ class BidderHelperTests(unittest.TestCase):
     self.assertEqual(reputation, self.reputation + self.commitment / 100 / (1-self.commitment))
 
 
+class GrowableArrayTests(unittest.TestCase):
+  def test_append_grows_capacity(self):
+    array = GrowableArray(dtype=np.int64, capacity=2)
+    for value in range(5):
+      array.append(value)
+    self.assertEqual(len(array), 5)
+    self.assertEqual(array[-1], 4)
+    self.assertEqual(array.values.tolist(), [0, 1, 2, 3, 4])
+    self.assertEqual(array.values.dtype, np.int64)
+
+
+class SuccessListTests(unittest.TestCase):
+  def test_append_keeps_running_count(self):
+    success_list = SuccessList(maxlen=3)
+    for report in [1, 1, 0, 1, 0, 0]:
+      success_list.append(report)
+      self.assertEqual(success_list.successes, sum(success_list))
+    self.assertEqual(list(success_list), [1, 0, 0])
+
+  def test_lebodics_reputation_update_uses_running_count(self):
+    helper = BidderHelper()
+    success_list = SuccessList(maxlen=5)
+    for report in [1,0,1,0,1,0,1]:
+      success_list.append(report)
+    self.assertEqual(helper.lebodics_reputation_update(5, 0.5, success_list), 0.4)
+
+  def test_lebodics_reputation_update_for_longer_list(self):
+    helper = BidderHelper()
+    success_list = SuccessList(maxlen=7)
+    for report in [1,0,1,0,1,0,1]:
+      success_list.append(report)
+    self.assertEqual(helper.lebodics_reputation_update(5, 0.5, success_list), 0.4)
+
+  def test_copy_and_pickle_keep_running_count(self):
+    success_list = SuccessList([1, 0, 1, 1], maxlen=3)
+    self.assertEqual(success_list.successes, 2)
+    for duplicate in (copy.copy(success_list), copy.deepcopy(success_list),
+                      pickle.loads(pickle.dumps(success_list))):
+      self.assertIsInstance(duplicate, SuccessList)
+      self.assertEqual(list(duplicate), [0, 1, 1])
+      self.assertEqual(duplicate.maxlen, 3)
+      self.assertEqual(duplicate.successes, 2)
+
+
 class BidderTests(unittest.TestCase):
   def setUp(self):
     self.total_bitrate = 1000
@@ -135,18 +185,17 @@ class BidderTests(unittest.TestCase):
     self.assertEqual(self.bidder1._bidding_method.args, ())
 
   def test_available_bitrate_update(self):
-    usage_sr_numbers = [1, 2]
-    usage_bitrates = [488, 0]
-    reclaim_sr_numbers = [2, 1]
-    reclaim_bitrates = [488, self.total_bitrate]
+    # (SR number, expected available bitrate) pairs
+    usage_pairs = [(1, 488), (2, 0)]
+    reclaim_pairs = [(2, 488), (1, self.total_bitrate)]
     # Test bitrate usage
-    for i in range(2):
-      self.bidder1._update_available_bitrate(usage_sr_numbers[i], DMEventHandler.WEB_BROWSING)
-      self.assertEqual(self.bidder1.available_bitrate, usage_bitrates[i])
+    for sr_number, expected in usage_pairs:
+      self.bidder1._update_available_bitrate(sr_number, DMEventHandler.WEB_BROWSING)
+      self.assertEqual(self.bidder1.available_bitrate, expected)
     # Test bitrate reclaim
-    for i in range(2):
-      self.bidder1._update_available_bitrate(reclaim_sr_numbers[i])
-      self.assertEqual(self.bidder1.available_bitrate, reclaim_bitrates[i])
+    for sr_number, expected in reclaim_pairs:
+      self.bidder1._update_available_bitrate(sr_number)
+      self.assertEqual(self.bidder1.available_bitrate, expected)
 
   def test_success_list_update(self):
     service_type = DMEventHandler.WEB_BROWSING
@@ -155,11 +204,23 @@ class BidderTests(unittest.TestCase):
     self.bidder1._update_success_list(service_type)
     self.assertEqual(self.bidder1.success_list, [1, 0])
 
+  def test_deepcopy(self):
+    self.bidder1._update_success_list(DMEventHandler.WEB_BROWSING)
+    duplicate = copy.deepcopy(self.bidder1)
+    self.assertEqual(duplicate.success_list, self.bidder1.success_list)
+    self.assertEqual(duplicate.reputation, self.bidder1.reputation)
+
+  def test_success_list_bounded_by_window_size(self):
+    service_type = DMEventHandler.WEB_BROWSING
+    for _ in range(2 * self.lebodic_params['window_size']):
+      self.bidder1._update_success_list(service_type)
+    self.assertEqual(len(self.bidder1.success_list), self.lebodic_params['window_size'])
+
 
 class DMEventHandlerTests(unittest.TestCase):
   def setUp(self):
     self.se = SimulationEngine()
-    self.se.prng = np.random.RandomState(0)
+    self.se.prng = np.random.default_rng(0)
     self.dmeh = DMEventHandler(self.se)
     self.dmeh.interarrival_rate = 0.5
     self.dmeh.duration = 2.5
@@ -167,19 +228,34 @@ class DMEventHandlerTests(unittest.TestCase):
   def test_init(self):
     self.assertEqual(self.dmeh.interarrival_rate, 0.5)
     self.assertEqual(self.dmeh.duration, 2.5)
+    self.assertEqual(self.dmeh.output_format, 'npz')
+
+  def test_handle_start_refreshes_service_types(self):
+    bitrates = DMEventHandler.BITRATES
+    self.addCleanup(setattr, DMEventHandler, 'BITRATES', bitrates)
+    DMEventHandler.BITRATES = {3: 512}
+    self.dmeh.handle_start()
+    self.assertEqual(self.dmeh._service_types.tolist(), [3])
+    self.assertEqual(list(self.dmeh._prices.keys()), [3])
 
   def test_generate_sr_event(self):
     event_time = 1.5
     event = self.dmeh._generate_sr_event(event_time)
-    prng = np.random.RandomState(0)
-    bundle = (float(prng.choice(self.dmeh._w_space, 1)[0]),
-              prng.choice(list(DMEventHandler.BITRATES.keys()), 1)[0])
     self.assertEqual(event.identifier, DMEventHandler.SR_EVENT)
     self.assertGreater(event.time, event_time)
     self.assertIsInstance(event.kwargs.get('bundle', None), tuple)
     self.assertIn(event.kwargs.get('bundle', None)[0], self.dmeh._w_space)
     self.assertIn(event.kwargs.get('bundle', None)[1], DMEventHandler.BITRATES.keys())
 
+  def test_generate_sr_events_in_batches(self):
+    self.dmeh.batch_size = 3
+    times = [self.dmeh._generate_sr_event(0.0).time for _ in range(3)]
+    self.assertEqual(times, sorted(times))
+    self.assertEqual(self.dmeh._sr_index, self.dmeh._sr_times.size)
+    event = self.dmeh._generate_sr_event(times[-1])
+    self.assertGreater(event.time, times[-1])
+    self.assertEqual(self.dmeh._sr_times.size - self.dmeh._sr_index, 2)
+
   def test_generate_st_event(self):
     event_time = 1.5
     event = self.dmeh._generate_st_event(event_time, None)
@@ -196,12 +272,40 @@ class DMEventHandlerTests(unittest.TestCase):
           bidding_params={'method':'myopic'}, reputation=0.75,
           reputation_params={'method':'lebodic', 'window_size':5})]
     self.dmeh.bidders = bidders
-    self.assertEqual(self.dmeh._select_winner(DMEventHandler.WEB_BROWSING, 0.5),
-                     bidders[1])
-    self.assertEqual(self.dmeh._select_winner(DMEventHandler.WEB_BROWSING, 0.25),
-                     bidders[0])
-    self.assertEqual(self.dmeh._select_winner(DMEventHandler.WEB_BROWSING, 0.75),
-                     bidders[1])
+    for price_weight, index in ((0.5, 1), (0.25, 0), (0.75, 1)):
+      winner, win_bid = self.dmeh._select_winner(DMEventHandler.WEB_BROWSING, price_weight)
+      self.assertEqual(winner, bidders[index])
+      self.assertEqual(win_bid, bidders[index].submit_bid(DMEventHandler.WEB_BROWSING,
+                       price_weight, bidders[1-index].reputation))
+
+  def test_select_winner_reads_current_bidders(self):
+    # Bidders appended in place, with IDs that coincide
+    for reputation, cost in ((0.25, 0.75), (0.75, 0.25)):
+      Bidder.reset_id_counter()
+      self.dmeh.bidders.append(Bidder(10000, costs={DMEventHandler.WEB_BROWSING: cost},
+          bidding_params={'method':'myopic'}, reputation=reputation,
+          reputation_params={'method':'lebodic', 'window_size':5}))
+    for price_weight, index in ((0.5, 1), (0.25, 0), (0.75, 1)):
+      winner, _ = self.dmeh._select_winner(DMEventHandler.WEB_BROWSING, price_weight)
+      self.assertIs(winner, self.dmeh.bidders[index])
+
+  def test_save_results_npz(self):
+    bidder = Bidder(10000, costs={DMEventHandler.WEB_BROWSING: 0.5},
+        bidding_params={'method':'myopic'}, reputation=0.5,
+        reputation_params={'method':'lebodic', 'window_size':5})
+    bidder.update_reputation_history()
+    bidder.update_winning_history(True)
+    self.dmeh.bidders = [bidder]
+    self.dmeh._sr_count = 1
+    self.dmeh.output_format = 'npz'
+    with tempfile.TemporaryDirectory() as save_dir:
+      self.dmeh.save_dir = save_dir
+      self.dmeh.sim_id = 0
+      self.dmeh._save_results()
+      with np.load(os.path.join(save_dir, '0', 'results.npz')) as archive:
+        name = str(bidder).lower()
+        self.assertEqual(archive['reputation_' + name].tolist(), [0.5])
+        self.assertEqual(archive['winnings_' + name].tolist(), [1])
 
 
 if __name__ == '__main__':
@@ -48,6 +48,17 @@ class SimulationEngineTests(unittest.TestCase):
     self.assertEqual(self.se.event_handler.events[0].time, 1)
     self.assertEqual(self.se.event_handler.events[1].identifier, "End")
     self.assertEqual(self.se.event_handler.events[1].time, 2)
+
+  def test_events_handled_in_time_order(self):
+    self.se.stop(5)
+    self.se.schedule(Event("Third", 3))
+    self.se.schedule(Event("First", 1))
+    self.se.schedule(Event("Second", 2, order=0))
+    self.se.schedule(Event("Second", 2, order=1))
+    self.se.start()
+    self.assertEqual([e.identifier for e in self.se.event_handler.events],
+        ["First", "Second", "Second", "Third", "End"])
+    self.assertEqual([e.kwargs['order'] for e in self.se.event_handler.events[1:3]], [0, 1])
   
 
 class EventTests(unittest.TestCase):
@@ -61,6 +72,10 @@ class EventTests(unittest.TestCase):
     self.assertEqual(self.e2.identifier, "Arrival")
     self.assertEqual(self.e2.time, 10)
     self.assertEqual(self.e2.kwargs.get('special', None), "Special")
+
+  def test_has_no_instance_dict(self):
+    with self.assertRaises(AttributeError):
+      self.e1.__dict__
   
 
 if __name__ == '__main__':
@@ -14,16 +14,22 @@ import simulator.tests.sim as sim
 # 1. BidderHelper class
 unittest.TextTestRunner(verbosity=2).run(
     unittest.TestLoader().loadTestsFromTestCase(dm.BidderHelperTests))
-# 2. Bidder class
+# 2. GrowableArray class
+unittest.TextTestRunner(verbosity=2).run(
+    unittest.TestLoader().loadTestsFromTestCase(dm.GrowableArrayTests))
+# 3. SuccessList class
+unittest.TextTestRunner(verbosity=2).run(
+    unittest.TestLoader().loadTestsFromTestCase(dm.SuccessListTests))
+# 4. Bidder class
 unittest.TextTestRunner(verbosity=2).run(
     unittest.TestLoader().loadTestsFromTestCase(dm.BidderTests))
-# 3. DMEventHandler class
+# 5. DMEventHandler class
 unittest.TextTestRunner(verbosity=2).run(
     unittest.TestLoader().loadTestsFromTestCase(dm.DMEventHandlerTests))
-# 4. SimulatorEngine class
+# 6. SimulatorEngine class
 unittest.TextTestRunner(verbosity=2).run(
     unittest.TestLoader().loadTestsFromTestCase(sim.SimulationEngineTests))
-# 5. Event class
+# 7. Event class
 unittest.TextTestRunner(verbosity=2).run(
     unittest.TestLoader().loadTestsFromTestCase(sim.EventTests))
 